@@ -5,12 +5,27 @@
 # ]
 # ///
 import collections
+import copy
+import ctypes
+import ctypes.util
+import fnmatch
+import functools
+import hashlib
 import json
 import logging
+import multiprocessing
 import os
 import re
+import select
+import shlex
+import shutil
+import signal
+import sqlite3
 import subprocess
+import sys
 import tempfile
+import threading
+import time
 import typing
 from pathlib import Path
 
@@ -41,23 +56,71 @@ No documentation available.
 -----------------------
 """
 
+# Stand-in for make's SHELL during database generation (see `--shell-cache`).
+# Memoizes `$(shell ..)` output keyed by shell-flags, command text and cwd.
+SHELL_CACHE_WRAPPER = """#!{python}
+import hashlib, json, os, re, subprocess, sys
+
+*flags, cmd = sys.argv[1:] or ["-c", ""]
+cache_dir = os.environ["MKPARSE_SHELL_CACHE_DIR"]
+allow = os.environ.get("MKPARSE_SHELL_CACHE_ALLOW", "")
+deny = os.environ.get("MKPARSE_SHELL_CACHE_DENY", "")
+key = hashlib.sha256(json.dumps([flags, cmd, os.getcwd()]).encode()).hexdigest()
+path = os.path.join(cache_dir, key + ".out")
+ok = (not allow or re.search(allow, cmd)) and not (deny and re.search(deny, cmd))
+status = "skipped" if not ok else "cached" if os.path.exists(path) else "executed"
+if status == "cached":
+    with open(path, "rb") as fhandle:
+        sys.stdout.buffer.write(fhandle.read())
+    rc = 0
+else:
+    proc = subprocess.run(["{shell}", *flags, cmd], stdout=subprocess.PIPE)
+    sys.stdout.buffer.write(proc.stdout)
+    rc = proc.returncode
+    if ok and rc == 0:
+        tmp = "{{}}.{{}}.tmp".format(path, os.getpid())
+        with open(tmp, "wb") as fhandle:
+            fhandle.write(proc.stdout)
+        os.replace(tmp, path)
+log = os.environ.get("MKPARSE_SHELL_CACHE_LOG")
+if log:
+    with open(log, "a") as fhandle:
+        fhandle.write(json.dumps(dict(cmd=cmd, cwd=os.getcwd(), status=status)) + "\\n")
+sys.exit(rc)
+"""
+SHELL_CACHE_DENY = r"\b(date|mktemp|uuidgen|shuf)\b|RANDOM|SECONDS"
+
 PRIVATE_PREFIXES = "self .".split()
 CONSOLE = Console(stderr=True)
 _recipe_pattern = "#  recipe to execute (from '"
 _variables_pattern = "# Variables"
 _variables_end_pattern = "# variable set hash-table stats:"
 _ht_stats_pattern = "# files hash-table stats:"
+_makefile_list_pattern = "MAKEFILE_LIST := "
+_environment_pattern = "# environment"
+_db_timestamp_patterns = (
+    "# Make data base, printed on ",
+    "# Finished Make data base on ",
+    "#  Last modified ",
+)
+_curdir_pattern = "CURDIR := "
 
 ## Logging
 ##░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░
 
 
 def get_logger(name, console=CONSOLE):
-    log_handler = RichHandler(
-        rich_tracebacks=True,
-        console=console,
-        show_time=False,
-    )
+    if console.is_terminal:
+        log_handler = RichHandler(
+            rich_tracebacks=True,
+            console=console,
+            show_time=False,
+        )
+        fmt = ["%(name)s", "%(message)s"]
+    else:
+        # rich rendering is costly per-record and only useful for humans
+        log_handler = logging.StreamHandler(sys.stderr)
+        fmt = ["%(levelname)s", "%(name)s", "%(message)s"]
 
     logging.basicConfig(
         format="%(message)s",
@@ -66,7 +129,7 @@ def get_logger(name, console=CONSOLE):
     )
     FormatterClass = logging.Formatter
     formatter = FormatterClass(
-        fmt=" ".join(["%(name)s", "%(message)s"]),
+        fmt=" ".join(fmt),
         # datefmt="%Y-%m-%d %H:%M:%S",
         datefmt="",
     )
@@ -129,6 +192,13 @@ def _get_file(body=None, makefile=None):
         return str(makefile)
 
 
+def _relative_path(file: str) -> str:
+    try:
+        return str(Path(file).resolve().relative_to(Path.cwd()))
+    except ValueError:
+        return str(file)
+
+
 def zip_markdown(docs):
     if isinstance(docs, (list,)):
         docs = "\n".join(docs)
@@ -146,6 +216,341 @@ def zip_markdown(docs):
         return result.split("\n")
 
 
+## Model Cache
+##░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░
+
+# makefile -> every file make actually read for it, as of the last db build.
+# Only a hint for what to fingerprint before the next build; validation always
+# uses the sources/fingerprint of the build itself (see `_database(build=..)`).
+_SOURCES: typing.Dict[str, typing.List[str]] = {}
+
+
+def _fingerprint(files: typing.List[str], since: int = 0) -> typing.Tuple:
+    """
+    Stat-only fingerprint for the given files (never reads them).
+    Missing files are fingerprinted as `None` so that creating them
+    later also invalidates.  Files modified at/after `since` (in ns)
+    are fingerprinted as "dirty", which never matches a later check.
+    """
+    out = []
+    for fname in files:
+        try:
+            st = os.stat(fname)
+        except OSError:
+            out.append((fname, None))
+        else:
+            if since and st.st_mtime_ns >= since:
+                out.append((fname, "dirty"))
+            else:
+                out.append((fname, st.st_ino, st.st_mtime_ns, st.st_size))
+    return tuple(out)
+
+
+def _sizeof(obj, seen=None) -> int:
+    """
+    Rough deep `sys.getsizeof` for the JSON-ish models we cache.
+    """
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_sizeof(k, seen) + _sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(_sizeof(x, seen) for x in obj)
+    return size
+
+
+class ModelCache:
+    """
+    In-process LRU/TTL cache for parsed makefile models.
+
+    Entries are validated against a stat-only fingerprint of the
+    makefile and everything it includes, so a hit never forks make
+    and never reads from disk.  This only pays off for long-running
+    consumers that import this module; the CLI is one-shot.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = self.misses = self.evictions = 0
+        self._data: collections.OrderedDict = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build: typing.Dict = None):
+        """
+        Returns cached value for key, or `None` on miss/stale.
+        On a hit, `build` is updated with the entry's sources and
+        fingerprint, as if it had been passed to `_database`.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                stamp, files, fprint, value = entry
+                expired = self.ttl and (time.monotonic() - stamp) > self.ttl
+                if not expired and _fingerprint(files) == fprint:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    if build is not None:
+                        build.update(sources=files, fingerprint=fprint)
+                    return copy.deepcopy(value)
+                LOGGER.debug("cache: stale entry for %s", key)
+                del self._data[key]
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def put(self, key, value, files: typing.List[str], fprint: typing.Tuple = None):
+        """
+        Caches value for key.  `fprint` should be taken *before* the
+        value was built (see `_database`), so that changes made during
+        the build invalidate the entry.
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (
+                time.monotonic(),
+                files,
+                _fingerprint(files) if fprint is None else fprint,
+                copy.deepcopy(value),
+            )
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> typing.Dict:
+        """
+        Hit-rate and (approximate) memory usage for this cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return dict(
+                size=len(self._data),
+                maxsize=self.maxsize,
+                ttl=self.ttl,
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                hit_rate=(self.hits / lookups) if lookups else 0.0,
+                bytes=_sizeof(self._data),
+            )
+
+
+MODEL_CACHE = ModelCache(
+    maxsize=int(os.environ.get("MKPARSE_CACHE_SIZE", 128)),
+    ttl=float(os.environ.get("MKPARSE_CACHE_TTL", 0)),
+)
+
+
+def cached_model(fxn):
+    """
+    Decorator: memoizes a model-building function in `MODEL_CACHE`.
+    Keyed on function name and arguments; validated on the makefile's
+    source-files as reported by make itself, using the fingerprint
+    from before the build.  Callers may pass `build={}` to receive
+    both, whether or not make actually ran.
+    """
+
+    @functools.wraps(fxn)
+    def wrapper(*args, build: typing.Dict = None, **kwargs):
+        build = {} if build is None else build
+        makefile = kwargs.get("makefile") or (args[0] if args else "")
+        key = json.dumps([fxn.__name__, args, kwargs], sort_keys=True, default=str)
+        out = MODEL_CACHE.get(key, build)
+        if out is not None:
+            LOGGER.debug("cache: hit for %s(%s)", fxn.__name__, makefile)
+            return out
+        out = fxn(*args, build=build, **kwargs)
+        files = build.get("sources") or [makefile]
+        MODEL_CACHE.put(key, out, files, build.get("fingerprint"))
+        return out
+
+    return wrapper
+
+
+## Parallel Enrichment
+##░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░
+
+# Read-only state for enrichment workers in a forked pool.  Only ever
+# populated inside the children (by the pool initializer), which inherit
+# it copy-on-write instead of pickling; the parent never touches it, so
+# concurrent callers in different threads can't see each other's state.
+_SHARED: typing.Dict[str, typing.Any] = {}
+PARALLEL_THRESHOLD = int(os.environ.get("MKPARSE_PARALLEL_THRESHOLD", 5000))
+
+
+def _map_chunks(
+    fxn: typing.Callable, count: int, jobs: int = 1, **shared
+) -> typing.List:
+    """
+    Runs `fxn(start, end, shared)` over chunks of `range(count)`,
+    concatenating results in order so that output is identical to a
+    serial run.  In pool workers, `shared` is read from `_SHARED`.
+
+    Uses a forked process-pool only when `jobs > 1`, there are at
+    least `PARALLEL_THRESHOLD` items, and the platform supports fork;
+    otherwise runs serially in-process.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    parallel = all(
+        [
+            jobs > 1,
+            count >= PARALLEL_THRESHOLD,
+            "fork" in multiprocessing.get_all_start_methods(),
+        ]
+    )
+    if not parallel:
+        return fxn(0, count, shared)
+    size = -(-count // (jobs * 4))
+    chunks = [(i, min(i + size, count)) for i in range(0, count, size)]
+    LOGGER.info(f"enriching {count} items with {jobs} jobs, {len(chunks)} chunks")
+    pool = multiprocessing.get_context("fork").Pool(
+        jobs, initializer=_SHARED.update, initargs=(shared,)
+    )
+    with pool:
+        parts = pool.starmap(fxn, chunks)
+    return [x for part in parts for x in part]
+
+
+def _enrich_targets(
+    start: int, end: int, shared: typing.Dict = None
+) -> typing.List[typing.Tuple[str, dict]]:
+    """
+    Worker: builds (target_name, metadata) for a slice of target-lines.
+    """
+    shared = _SHARED if shared is None else shared
+    db = shared["db"]
+    db_index = shared["db_index"]
+    not_targets = shared["not_targets"]
+    implicit_targets_section = shared["implicit_targets_section"]
+    makefile = shared["makefile"]
+    raw_content = shared["raw_content"]
+    original = shared["original"]
+    abs_paths = shared["abs_paths"]
+    out = []
+    for tline in shared["targets"][start:end]:
+        if any(
+            [
+                tline.startswith(" "),
+            ]
+            + [
+                tline.startswith(x)
+                for x in "$ @ & \t".split(" ") + ".SUFFIXES: .INTERMEDIATE:".split()
+            ]
+            + [";" in tline]
+        ):
+            continue
+        bits = tline.split(":")
+        target_name = bits.pop(0)
+        childs = ":".join(bits)
+        type = "implicit" if tline in implicit_targets_section else "file"
+        # NB: line nos are from reformatted output, not original file
+        line_start = db_index[tline]
+        line_end = db.index("", line_start)
+        target_body = db[line_start:line_end]
+        pline = _get_provenance_line(target_body)
+        file = _get_file(
+            body=target_body,
+            makefile=makefile,
+        )
+
+        # user requested absolute-paths
+        if file and not abs_paths:
+            file = _relative_path(file)
+        if pline:
+            # take advice from make's database.
+            # we return this because it's authoritative,
+            # but actually sometimes it's wrong.  this returns
+            # the first line of the target that's tab-indented,
+            # but sometimes make macros like `ifeq` are not indented..
+            lineno = pline.split("', line ")[-1].split("):")[0]
+        else:
+            try:
+                lineno = original.index(tline)
+            except ValueError:
+                LOGGER.debug("cant find %s in %s, included?", tline, makefile)
+                # target_name
+                lineno = None
+        lineno = lineno and (int(lineno) - 1)
+        prereqs = [x for x in childs.split() if x.strip()]
+        header = target_body.pop(0)
+
+        # This is probably an invocation of a parametric target?
+        if f"{target_name}:" in not_targets:
+            continue
+
+        # FIXME: determining locality is still buggy for complex scenarios, multiple includes, etc
+        is_local = file == makefile
+        if (
+            is_local
+            and type != "implicit"
+            and not re.findall(
+                r"^" + target_name + r"(?: [a-zA-Z\-_/]+)*:.*",
+                raw_content,
+                re.MULTILINE,
+            )
+        ):
+            LOGGER.debug("revoking local: %s", target_name)
+            is_local = False
+        target_docs = [x[len("\t@#") :] for x in target_body if x.startswith("\t@#")]
+        if target_docs and target_docs[-1] == "":
+            target_docs.pop(-1)
+        meta = {
+            "file": file,
+            "lineno": lineno,
+            "header": header,
+            "body": [b.lstrip() for b in target_body if not b.startswith("#  ")],
+            "parametric": "%" in target_name,
+            "chain": None,
+            "type": type,
+            "docs": target_docs,
+            "prereqs": list(set(prereqs)),
+            "local": is_local,
+            "private": any(target_name.startswith(x) for x in PRIVATE_PREFIXES),
+        }
+        if type == "implicit":
+            regex = target_name.replace("%", ".*")
+            meta.update(regex=regex, implicit=True)
+            if file == makefile and not re.findall(
+                # rf"^{target_name}:.*", raw_content, re.MULTILINE
+                r"^" + target_name + r"(?: [a-zA-Z\-_/]+)*:.*",
+                raw_content,
+                re.MULTILINE,
+            ):
+                meta.update(dynamic=True)
+                # out['local']
+        out.append((target_name, meta))
+
+    return out
+
+
+def _enrich_implementors(
+    start: int, end: int, shared: typing.Dict = None
+) -> typing.List[typing.Tuple]:
+    """
+    Worker: finds implementors for a slice of parametric targets.
+    """
+    shared = _SHARED if shared is None else shared
+    names = shared["names"]
+    out = []
+    for target_name, regex in shared["patterns"][start:end]:
+        regex = re.compile(regex)
+        implementors = [
+            impl for impl in names if impl != target_name and regex.match(impl)
+        ]
+        out.append((target_name, implementors))
+    return out
+
+
 ## Targets Entrypoint
 ##░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░
 
@@ -159,12 +564,60 @@ o_locals = click.option(
 o_local = click.option(
     "--local", is_flag=True, default=False, help="Alias for --locals"
 )
+o_shell_cache = click.option(
+    "--shell-cache",
+    is_flag=True,
+    default=False,
+    help="Memoize $(shell ..) calls while building make's db (assumes idempotent)",
+)
+o_snapshot = click.option(
+    "--snapshot",
+    is_flag=True,
+    default=False,
+    help="Load from 'export-snapshot' output, skipping make (reparses if stale)",
+)
+o_timeout = click.option(
+    "--timeout",
+    type=float,
+    default=float(os.environ.get("MKPARSE_TIMEOUT", 0)),
+    help="Deadline in seconds for building make's db (0 means no deadline)",
+)
+o_clean_env = click.option(
+    "-E",
+    "--clean-env",
+    is_flag=True,
+    default=False,
+    help="Run make with only $MKPARSE_ENV_WHITELIST vars and drop env from its db",
+)
 
 
 @click.command()
 @o_local
 @o_locals
-@click.option("--target", help="Retrieves help for named target only")
+@o_shell_cache
+@o_clean_env
+@o_timeout
+@o_snapshot
+@click.option(
+    "-t",
+    "--target",
+    multiple=True,
+    help="Retrieves help for named target(s) only (repeatable, or comma-separated)",
+)
+@click.option(
+    "-g",
+    "--glob",
+    "target_glob",
+    default="",
+    help="Retrieves help for targets matching glob only",
+)
+@click.option(
+    "-r",
+    "--regex",
+    "target_regex",
+    default="",
+    help="Retrieves help for targets matching regex only",
+)
 @click.option(
     "-m",
     "--markdown",
@@ -207,6 +660,12 @@ o_local = click.option(
     default=False,
     help="Simple target extraction without make's db. (Does not process includes/macros)",
 )
+@click.option(
+    "-j",
+    "--jobs",
+    default=1,
+    help="Processes for enrichment on large makefiles (0 for all CPUs)",
+)
 @click.option(
     "--parametrics",
     is_flag=True,
@@ -255,16 +714,14 @@ def targets(*args, **kwargs):
     markdown = markdown or preview
     names_only = kwargs["names_only"]
     out = _targets(*args, **kwargs)
+    missing = [t for t in _split_names(kwargs["target"]) if t not in out]
     # user requested only target-names
     if names_only:
-        return print("\n".join(out.keys()))
+        print("\n".join(out.keys()))
 
     # user requested markdown output, not json
-    if markdown:
-        template = jinja2.Template(DOCS_TEMPLATE)
-        str_out = ""
-        for target in out:
-            str_out += "\n" + template.render(target=target, **out[target])
+    elif markdown:
+        str_out = _render_markdown(out)
         if preview:
             glow_img = "charmcli/glow:v1.5.1"
             glow_theme = "dracula"
@@ -286,10 +743,33 @@ def targets(*args, **kwargs):
     else:
         json_output(out)
 
+    # some explicitly requested targets were not found
+    if missing:
+        sys.exit(1)
+
+
+def _render_markdown(out: typing.Dict) -> str:
+    template = jinja2.Template(DOCS_TEMPLATE)
+    str_out = ""
+    for target in out:
+        str_out += "\n" + template.render(target=target, **out[target])
+    return str_out
+
+
+def _split_names(names: typing.Union[str, typing.Iterable[str]]) -> typing.List[str]:
+    """
+    Normalizes target-names from either a comma-separated string or
+    an iterable of (possibly comma-separated) strings.
+    """
+    names = [names] if isinstance(names, str) else list(names or [])
+    return [n.strip() for name in names for n in name.split(",") if n.strip()]
+
 
 def _targets(
     makefile: str = None,
-    target: str = "",
+    target: typing.Union[str, typing.Iterable[str]] = "",
+    target_glob: str = "",
+    target_regex: str = "",
     prefix: str = "",
     body: bool = False,
     interpolate: bool = False,
@@ -306,6 +786,8 @@ def _targets(
     preview: bool = False,
     markdown: bool = False,
     parse_target_aliases: bool = True,
+    jobs: int = 1,
+    snapshot: bool = False,
     **kwargs,
 ):
     """
@@ -318,14 +800,11 @@ def _targets(
     if names_only:
         err = "--names-only is exclusive with {markdown|preview} "
         assert not any([markdown, preview]), err + f"{markdown,preview}"
-
-    def _test(x):
-        tests = [
-            ":" in x.strip(),
-            not x.startswith("#"),
-            not x.startswith("\t"),
-        ]
-        return all(tests)
+    if target_regex:
+        try:
+            target_regex = re.compile(target_regex)
+        except re.error as exc:
+            raise click.BadParameter(str(exc), param_hint="'--regex'")
 
     if shallow:
         LOGGER.warning(f"Parsing {makefile} in shallow-mode!")
@@ -344,185 +823,33 @@ def _targets(
             if re.match(r"^[a-zA-Z-_/]+[:][^=]", line)
         ]
         return lines
-    db = _database(makefile, **kwargs)
-    raw_db = "\n".join(db)
-    validate_makefile(makefile)
-    with open(makefile) as fhandle:
-        raw_content = fhandle.read()
-    original = raw_content.split("\n")
-    variables_start = db.index(_variables_pattern)
-    variables_end = db.index("", variables_start + 2)
-    # vars = db[variables_start:variables_end]
-    db = db[variables_end:]
-    implicit_rule_start = db.index("# Implicit Rules")
-    file_rule_start = db.index("# Files")
-    file_rule_end = db.index(_ht_stats_pattern)
-    for i, line in enumerate(db[implicit_rule_start:]):
-        if "implicit rules, " in line and line.endswith(" terminal."):
-            implicit_rule_end = implicit_rule_start + i
-            break
-    else:
-        LOGGER.critical("cannot find `implicit_rule_end`!")
-        implicit_rule_end = implicit_rule_start
-    implicit_targets_section = db[implicit_rule_start:implicit_rule_end]
-    file_targets_section = db[file_rule_start:file_rule_end]
-    file_target_names = list(filter(_test, file_targets_section))
-    implicit_target_names = list(filter(_test, implicit_targets_section))
-    targets = file_target_names + implicit_target_names
-    out = {}
-    targets = [t for t in targets if t != f"{makefile}:"]
-    for tline in targets:
-        if any(
-            [
-                tline.startswith(" "),
-            ]
-            + [
-                tline.startswith(x)
-                for x in "$ @ & \t".split(" ") + ".SUFFIXES: .INTERMEDIATE:".split()
-            ]
-            + [";" in tline]
-        ):
-            continue
-        bits = tline.split(":")
-        target_name = bits.pop(0)
-        childs = ":".join(bits)
-        type = "implicit" if tline in implicit_targets_section else "file"
-        # NB: line nos are from reformatted output, not original file
-        line_start = db.index(tline)
-        line_end = db.index("", line_start)
-        target_body = db[line_start:line_end]
-        pline = _get_provenance_line(target_body)
-        file = _get_file(
-            body=target_body,
-            makefile=makefile,
-        )
-
-        # user requested absolute-paths
-        if file and not abs_paths:
-            try:
-                file = str(Path(file).resolve().relative_to(Path.cwd()))
-            except ValueError:
-                file = str(file)
-        if pline:
-            # take advice from make's database.
-            # we return this because it's authoritative,
-            # but actually sometimes it's wrong.  this returns
-            # the first line of the target that's tab-indented,
-            # but sometimes make macros like `ifeq` are not indented..
-            lineno = pline.split("', line ")[-1].split("):")[0]
-        else:
-            try:
-                lineno = original.index(tline)
-            except ValueError:
-                LOGGER.debug(f"cant find {tline} in {makefile}, included?")
-                # target_name
-                lineno = None
-        lineno = lineno and (int(lineno) - 1)
-        prereqs = [x for x in childs.split() if x.strip()]
-        header = target_body.pop(0)
+    out = _snapshot_load(makefile, "targets") if snapshot else None
+    if out is None:
+        try:
+            out = _target_model(
+                makefile,
+                abs_paths=abs_paths,
+                parse_target_aliases=parse_target_aliases,
+                jobs=jobs,
+                **kwargs,
+            )
+        except TimeoutError as exc:
+            LOGGER.warning(f"{exc}; falling back to a partial, make-free parse")
+            out = _shallow_model(
+                makefile,
+                abs_paths=abs_paths,
+                parse_target_aliases=parse_target_aliases,
+            )
+    elif not abs_paths:
+        for tmeta in out.values():
+            tmeta["file"] = tmeta["file"] and _relative_path(tmeta["file"])
 
-        # This is probably an invocation of a parametric target?
-        if f"\n# Not a target:\n{target_name}:\n" in raw_db:
-            continue
-
-        # FIXME: determining locality is still buggy for complex scenarios, multiple includes, etc
-        is_local = file == makefile
-        if (
-            is_local
-            and type != "implicit"
-            and not re.findall(
-                r"^" + target_name + r"(?: [a-zA-Z\-_/]+)*:.*",
-                raw_content,
-                re.MULTILINE,
-            )
-        ):
-            LOGGER.debug(f"revoking local: {target_name}")
-            is_local = False
-        target_docs = [x[len("\t@#") :] for x in target_body if x.startswith("\t@#")]
-        if target_docs and target_docs[-1] == "":
-            target_docs.pop(-1)
-        out[target_name] = {
-            "file": file,
-            "lineno": lineno,
-            "header": header,
-            "body": [b.lstrip() for b in target_body if not b.startswith("#  ")],
-            "parametric": "%" in target_name,
-            "chain": None,
-            "type": type,
-            "docs": target_docs,
-            "prereqs": list(set(prereqs)),
-            "local": is_local,
-            "private": any(target_name.startswith(x) for x in PRIVATE_PREFIXES),
-        }
-        if type == "implicit":
-            regex = target_name.replace("%", ".*")
-            out[target_name].update(regex=regex, implicit=True)
-            if file == makefile and not re.findall(
-                # rf"^{target_name}:.*", raw_content, re.MULTILINE
-                r"^" + target_name + r"(?: [a-zA-Z\-_/]+)*:.*",
-                raw_content,
-                re.MULTILINE,
-            ):
-                out[target_name].update(dynamic=True)
-                # out['local']
-
-    for target_name, tmeta in out.items():
-        if "regex" in tmeta:
-            implementors = []
-            for impl in out:
-                if impl != target_name and re.compile(tmeta["regex"]).match(impl):
-                    implementors.append(impl)
-            out[target_name]["implementors"] = implementors
-
-    for target_name, tmeta in out.items():
-        real_body = [
-            b
-            for b in tmeta["body"][1:]
-            if not b.startswith("#") and not b.startswith("@#")
-        ]
-        if not real_body:
-            LOGGER.debug(f"missing body for: {target_name}")
-            for chain in out:
-                if target_name in out[chain].get("implementors", []):
-                    tmeta["chain"] = chain
-            if len(tmeta["prereqs"]) == 1:
-                tmeta["chain"] = tmeta["prereqs"][0]
-        else:
-            tmeta["chain"] = []
-        out[target_name] = tmeta
-
-    for target_name, tmeta in out.items():
-        # if this is a simple alias with no docs, pull the docs from the principal
-        if not tmeta["docs"] and tmeta["chain"]:
-            out[target_name]["docs"] = out.get(tmeta["chain"], {}).get("docs", [])
-
-        # user requested enriching docs with markdown
-        if markdown:
-            docs = out[target_name]["docs"]
-            zmd = zip_markdown(docs)
-            out[target_name]["docs"] = [] if not any(zmd) else zmd
-
-    # autodocs for target aliases
-    if parse_target_aliases:
-        tmp = {}
-        for aliases_maybe, v in out.items():
-            aliases = aliases_maybe.split(" ")
-            if len(aliases) > 1:
-                primary = aliases.pop(0)
-                tmp[primary] = v
-                for alias in aliases:
-                    tmp[alias] = {
-                        **v,
-                        **{
-                            "alias": True,
-                            "primary": primary,
-                            "docs": [f"(Alias for '{primary}')"],
-                        },
-                    }
-            else:
-                tmp[aliases_maybe] = v
-        out = tmp
-    ALL = out.copy()
+    # user requested enriching docs with markdown
+    if markdown:
+        for tmeta in out.values():
+            zmd = zip_markdown(tmeta["docs"])
+            tmeta["docs"] = [] if not any(zmd) else zmd
+    ALL = out.copy()
 
     # filter: user requested only implicits
     if implicit:
@@ -551,10 +878,16 @@ def _targets(
         LOGGER.info("Excluding nonlocal targets..")
         out = {k: v for k, v in out.items() if v.get("local", False) is True}
 
-    # user requested target-search
-    # NB: this changes the response schema!
-    if target:
-        out = out.get(target, {})
+    # user requested target-search, by name(s) and/or pattern
+    requested = _split_names(target)
+    if requested or target_glob or target_regex:
+        out = {
+            k: v
+            for k, v in out.items()
+            if k in requested
+            or (target_glob and fnmatch.fnmatchcase(k, target_glob))
+            or (target_regex and target_regex.search(k))
+        }
 
     # filter: used requested only targets with given prefix
     if prefix:
@@ -572,9 +905,10 @@ def _targets(
 
     # enrichment: user requested interpolated docs
     if interpolate:
+        interpolated, unsummarized = [], {}
         for target, data in out.items():
             if not data["docs"]:
-                LOGGER.warning(f"interpolating: {target}")
+                interpolated.append(target)
                 prereqs = data["prereqs"]
                 if not prereqs:
                     docs = []
@@ -582,7 +916,7 @@ def _targets(
                     docs = ["Stepwise summary:\n"]
                 for i, p in enumerate(prereqs):
                     alt = p[: p.find("/") + 1] + "%"
-                    LOGGER.warning([p, alt])
+                    LOGGER.debug("interpolating %s: %s", target, [p, alt])
                     pdocs = ALL.get(p, {}).get("docs", [])
                     if pdocs:
                         pdocs = f"`{p}`: {' '.join(pdocs[:1])}"
@@ -593,7 +927,7 @@ def _targets(
                         if subs:
                             pdocs = ",".join([f"`{sub}`" for sub in subs])
                         else:
-                            LOGGER.warning(f"failed retrieving docs for {target}")
+                            unsummarized[target] = None
                             pdocs = f"`{p}`: *(No summary available)* "
                     these_docs = f"{i+1}. {pdocs}"  # ('\n'.join(pdocs))
                     # doc=f"{i}. {p}\n{these_docs}"
@@ -606,6 +940,12 @@ def _targets(
                     )
                 out[target]["docs"] = docs
                 out[target]["interpolated"] = True
+        if interpolated:
+            LOGGER.warning(f"interpolated docs for these targets: {interpolated}")
+        if unsummarized:
+            LOGGER.warning(
+                f"failed retrieving prereq docs for these targets: {list(unsummarized)}"
+            )
 
     for k in ALL:
         tmp = out.get(k, {})
@@ -615,6 +955,9 @@ def _targets(
             pruned[k] = tmp
     if pruned:
         LOGGER.warning(f"pruned these targets with no details: {list(pruned.keys())}")
+    missing = [k for k in requested if k not in out]
+    if missing:
+        LOGGER.warning(f"requested targets were not found: {missing}")
 
     out = dict(
         sorted(
@@ -625,11 +968,285 @@ def _targets(
     return out
 
 
+@cached_model
+def _target_model(
+    makefile: str = None,
+    abs_paths: bool = True,
+    parse_target_aliases: bool = True,
+    jobs: int = 1,
+    **kwargs,
+) -> typing.Dict:
+    """
+    Builds metadata for all targets from make's db, before any
+    filtering or markdown is applied.
+    """
+    db = _database(makefile, **kwargs)
+    return _target_model_from_db(
+        db,
+        makefile,
+        abs_paths=abs_paths,
+        parse_target_aliases=parse_target_aliases,
+        jobs=jobs,
+    )
+
+
+def _target_model_from_db(
+    db: typing.List[str],
+    makefile: str,
+    abs_paths: bool = True,
+    parse_target_aliases: bool = True,
+    jobs: int = 1,
+) -> typing.Dict:
+    """
+    Like `_target_model`, but for a db that has already been built.
+    """
+
+    def _test(x):
+        tests = [
+            ":" in x.strip(),
+            not x.startswith("#"),
+            not x.startswith("\t"),
+        ]
+        return all(tests)
+
+    not_targets = {
+        db[i + 1] for i, line in enumerate(db[:-1]) if line == "# Not a target:"
+    }
+    validate_makefile(makefile)
+    with open(makefile) as fhandle:
+        raw_content = fhandle.read()
+    original = raw_content.split("\n")
+    variables_start = db.index(_variables_pattern)
+    variables_end = db.index("", variables_start + 2)
+    # vars = db[variables_start:variables_end]
+    db = db[variables_end:]
+    implicit_rule_start = db.index("# Implicit Rules")
+    file_rule_start = db.index("# Files")
+    file_rule_end = db.index(_ht_stats_pattern)
+    for i, line in enumerate(db[implicit_rule_start:]):
+        if "implicit rules, " in line and line.endswith(" terminal."):
+            implicit_rule_end = implicit_rule_start + i
+            break
+    else:
+        LOGGER.critical("cannot find `implicit_rule_end`!")
+        implicit_rule_end = implicit_rule_start
+    implicit_targets_section = db[implicit_rule_start:implicit_rule_end]
+    file_targets_section = db[file_rule_start:file_rule_end]
+    file_target_names = list(filter(_test, file_targets_section))
+    implicit_target_names = list(filter(_test, implicit_targets_section))
+    targets = file_target_names + implicit_target_names
+    targets = [t for t in targets if t != f"{makefile}:"]
+    db_index = {}
+    for i, line in enumerate(db):
+        db_index.setdefault(line, i)
+    out = dict(
+        _map_chunks(
+            _enrich_targets,
+            len(targets),
+            jobs=jobs,
+            targets=targets,
+            db=db,
+            db_index=db_index,
+            not_targets=not_targets,
+            implicit_targets_section=set(implicit_targets_section),
+            makefile=makefile,
+            raw_content=raw_content,
+            original=original,
+            abs_paths=abs_paths,
+        )
+    )
+    return _link_targets(out, parse_target_aliases=parse_target_aliases, jobs=jobs)
+
+
+def _link_targets(
+    out: typing.Dict, parse_target_aliases: bool = True, jobs: int = 1
+) -> typing.Dict:
+    """
+    Cross-target enrichment: implementors, chains, inherited docs
+    and aliases.
+    """
+    patterns = [(k, v["regex"]) for k, v in out.items() if "regex" in v]
+    for target_name, implementors in _map_chunks(
+        _enrich_implementors,
+        len(patterns),
+        jobs=jobs,
+        patterns=patterns,
+        names=list(out),
+    ):
+        out[target_name]["implementors"] = implementors
+
+    for target_name, tmeta in out.items():
+        real_body = [
+            b
+            for b in tmeta["body"][1:]
+            if not b.startswith("#") and not b.startswith("@#")
+        ]
+        if not real_body:
+            LOGGER.debug("missing body for: %s", target_name)
+            for chain in out:
+                if target_name in out[chain].get("implementors", []):
+                    tmeta["chain"] = chain
+            if len(tmeta["prereqs"]) == 1:
+                tmeta["chain"] = tmeta["prereqs"][0]
+        else:
+            tmeta["chain"] = []
+        out[target_name] = tmeta
+
+    for target_name, tmeta in out.items():
+        # if this is a simple alias with no docs, pull the docs from the principal
+        if not tmeta["docs"] and tmeta["chain"]:
+            out[target_name]["docs"] = out.get(tmeta["chain"], {}).get("docs", [])
+
+    # autodocs for target aliases
+    if parse_target_aliases:
+        tmp = {}
+        for aliases_maybe, v in out.items():
+            aliases = aliases_maybe.split(" ")
+            if len(aliases) > 1:
+                primary = aliases.pop(0)
+                tmp[primary] = v
+                for alias in aliases:
+                    tmp[alias] = {
+                        **v,
+                        **{
+                            "alias": True,
+                            "primary": primary,
+                            "docs": [f"(Alias for '{primary}')"],
+                        },
+                    }
+            else:
+                tmp[aliases_maybe] = v
+        out = tmp
+    return out
+
+
+def _shallow_model(
+    makefile: str = None, abs_paths: bool = True, parse_target_aliases: bool = True
+) -> typing.Dict:
+    """
+    Make-free fallback for `_target_model`, straight from the makefile's
+    text.  Includes, macros and dynamic targets are invisible here, so
+    every entry is marked `partial`.
+    """
+    validate_makefile(makefile)
+    with open(makefile) as fhandle:
+        original = fhandle.read().split("\n")
+    file = makefile if abs_paths else _relative_path(makefile)
+    pattern = re.compile(r"^([^\s:#=$][^:#=]*?)\s*:(?![:=])([^=]*)$")
+    out = {}
+    in_define = False
+    for i, line in enumerate(original):
+        if line.startswith("define"):
+            in_define = True
+        elif line.startswith("endef"):
+            in_define = False
+        match = not in_define and pattern.match(line)
+        if not match:
+            continue
+        target_name, childs = match.groups()
+        childs, _, recipe = childs.partition(";")
+        target_body = [recipe.strip()] if recipe.strip() else []
+        for bline in original[i + 1 :]:
+            if not bline.startswith("\t"):
+                break
+            target_body.append(bline.lstrip())
+        target_docs = [x[len("@#") :] for x in target_body if x.startswith("@#")]
+        out[target_name] = {
+            "file": file,
+            "lineno": i,
+            "header": line,
+            "body": target_body,
+            "parametric": "%" in target_name,
+            "chain": None,
+            "type": "implicit" if "%" in target_name else "file",
+            "docs": target_docs,
+            "prereqs": list(dict.fromkeys(childs.split())),
+            "local": True,
+            "private": any(target_name.startswith(x) for x in PRIVATE_PREFIXES),
+            "partial": True,
+        }
+        if "%" in target_name:
+            regex = target_name.replace("%", ".*")
+            out[target_name].update(regex=regex, implicit=True)
+    return _link_targets(out, parse_target_aliases=parse_target_aliases)
+
+
+## Shell Cache
+##░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░
+
+# Results of the last `--shell-cache` run: status -> list of commands
+SHELL_CACHE_REPORT: typing.Dict[str, typing.List[str]] = {}
+
+
+def _shell_cache_dir() -> Path:
+    default = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+    default = default / "mk.parse" / "shell"
+    return Path(os.environ.get("MKPARSE_SHELL_CACHE_DIR", default))
+
+
+def _shell_cache_cmd(cmd: str, log: str) -> str:
+    """
+    Installs the caching SHELL wrapper (if needed) and returns the
+    given make command-line, rewritten to use it.
+
+    NB: overriding SHELL on make's command-line also overrides any
+    `SHELL := ..` in the makefile, so the wrapper delegates to
+    `MKPARSE_SHELL_CACHE_SHELL` (default is bash, if available).
+    """
+    cache_dir = _shell_cache_dir()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    real_shell = os.environ.get(
+        "MKPARSE_SHELL_CACHE_SHELL", shutil.which("bash") or "/bin/sh"
+    )
+    wrapper = cache_dir / "shell-wrapper.py"
+    src = SHELL_CACHE_WRAPPER.format(python=sys.executable, shell=real_shell)
+    if not wrapper.exists() or wrapper.read_text() != src:
+        # NB: concurrent runs may be exec'ing the wrapper, so never truncate it
+        tmp = wrapper.with_name(f"{wrapper.name}.{os.getpid()}.tmp")
+        tmp.write_text(src)
+        tmp.chmod(0o755)
+        os.replace(tmp, wrapper)
+    env = dict(
+        MKPARSE_SHELL_CACHE_DIR=str(cache_dir),
+        MKPARSE_SHELL_CACHE_ALLOW=os.environ.get("MKPARSE_SHELL_CACHE_ALLOW", ""),
+        MKPARSE_SHELL_CACHE_DENY=os.environ.get(
+            "MKPARSE_SHELL_CACHE_DENY", SHELL_CACHE_DENY
+        ),
+        MKPARSE_SHELL_CACHE_LOG=log,
+    )
+    prefix = " ".join(f"{k}={shlex.quote(v)}" for k, v in env.items())
+    make, args = cmd.split(" ", 1)
+    return f"{prefix} {make} SHELL={shlex.quote(str(wrapper))} {args}"
+
+
+def _shell_cache_report(log: str) -> typing.Dict[str, typing.List[str]]:
+    """
+    Summarizes which `$(shell ..)` calls were cached, executed, or
+    skipped (i.e. not allowed), according to the wrapper's log.
+    """
+    report = collections.defaultdict(list)
+    with open(log) as fhandle:
+        for line in fhandle:
+            entry = json.loads(line)
+            report[entry["status"]].append(entry["cmd"])
+            LOGGER.debug("shell-cache: %s: %s", entry["status"], entry["cmd"])
+    SHELL_CACHE_REPORT.clear()
+    SHELL_CACHE_REPORT.update(report)
+    LOGGER.info(
+        "shell-cache: "
+        + ", ".join(f"{len(report[k])} {k}" for k in "cached executed skipped".split())
+    )
+    return SHELL_CACHE_REPORT
+
+
 ## DB Entrypoint
 ##░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░
 
 
 @click.command("database")
+@o_shell_cache
+@o_clean_env
+@o_timeout
 @click.argument("makefile")
 def database(*args, **kwargs):
     """
@@ -637,32 +1254,142 @@ def database(*args, **kwargs):
 
     This output comes from 'make --print-data-base'
     """
-    print("\n".join(_database(*args, **kwargs)))
+    try:
+        print("\n".join(_database(*args, **kwargs)))
+    except TimeoutError as exc:
+        LOGGER.critical(exc)
+        sys.exit(1)
 
 
-def _database(makefile: str = "", make="make") -> typing.List[str]:
+def _database(
+    makefile: str = "",
+    make="make",
+    shell_cache: bool = False,
+    clean_env: bool = False,
+    timeout: float = 0,
+    cwd: str = "",
+    build: typing.Dict = None,
+) -> typing.List[str]:
     """
     Get database for Makefile (This output comes from 'make
-    --print-data-base') # FIXME: nix the temporary file and use
-    streams.
+    --print-data-base').
+
+    If `cwd` is given, make runs there (like `make -C`), and the
+    makefile's sources are resolved against it.
+
+    If `build` is given, it's updated with `sources` (every file make
+    read) and their `fingerprint` as of *before* make ran, so that
+    edits made during the build count as changes.
+
+    Raises `TimeoutError` if make takes longer than `timeout` seconds,
+    after killing make and anything it spawned.
     """
     LOGGER.debug(f"building database for {makefile}")
     validate_makefile(makefile)
-    cmd = f"{make} --print-data-base -pqRrs -f {makefile} > .tmp.mk.db 2>/dev/null"
-    os.system(cmd)
-    with open(".tmp.mk.db") as fhandle:
-        out = fhandle.read().split("\n")
-    os.remove(".tmp.mk.db")
+    # files we don't know about yet are checked against the start time instead,
+    # with some slack for coarse mtime resolution.
+    build = {} if build is None else build
+    known = _SOURCES.get(makefile) or [makefile]
+    before = dict(zip(known, _fingerprint(known)))
+    started = time.time_ns() - 10**9
+    build.update(sources=known, fingerprint=tuple(before.values()))
+    cmd = f"{make} --print-data-base -pqRrs -f {makefile}"
+    with tempfile.NamedTemporaryFile(suffix=".jsonl") as log:
+        if shell_cache:
+            cmd = _shell_cache_cmd(cmd, log.name)
+        if clean_env:
+            cmd = _clean_env_cmd(cmd)
+        proc = subprocess.Popen(
+            cmd,
+            shell=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+            cwd=cwd or None,
+        )
+        try:
+            stdout, _ = proc.communicate(timeout=timeout or None)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+            proc.communicate()
+            raise TimeoutError(
+                f"make timed out after {timeout}s building database for {makefile}"
+            )
+        if shell_cache:
+            _shell_cache_report(log.name)
+    out = stdout.decode().split("\n")
+    if clean_env:
+        out = _scrub_database(out)
+    sources = [os.path.join(cwd, f) for f in _makefile_list(out)] or [makefile]
+    _SOURCES[makefile] = sources
+    build.update(
+        sources=sources,
+        fingerprint=tuple(
+            before.get(fname) or _fingerprint([fname], since=started)[0]
+            for fname in sources
+        ),
+    )
     return out
 
 
+def _clean_env_cmd(cmd: str) -> str:
+    """
+    Prefixes the given make command-line so that make only sees the
+    whitelisted environment (see `MKPARSE_ENV_WHITELIST`).
+    """
+    names = os.environ.get("MKPARSE_ENV_WHITELIST", "PATH HOME")
+    env = [
+        f"{name}={shlex.quote(os.environ[name])}"
+        for name in names.replace(",", " ").split()
+        if name in os.environ
+    ]
+    return " ".join(["env -i"] + env + [cmd])
+
+
+def _scrub_database(db: typing.List[str]) -> typing.List[str]:
+    """
+    Drops `# environment` variable-blocks, timestamps, mtimes and
+    `CURDIR` from make's db, so that output only depends on the
+    makefiles' content, and not on where or when they were checked out.
+    """
+    out = []
+    lines = iter(db)
+    for line in lines:
+        if line == _environment_pattern:
+            # multi-line values are printed as `define NAME .. endef`
+            if next(lines, "").startswith("define "):
+                for line in lines:
+                    if line == "endef":
+                        break
+        elif line.startswith(_curdir_pattern):
+            if out and out[-1].startswith("# "):
+                out.pop()
+        elif not line.startswith(_db_timestamp_patterns):
+            out.append(line)
+    return out
+
+
+def _makefile_list(db: typing.List[str]) -> typing.List[str]:
+    """
+    Every makefile that make actually read (i.e. the final value of
+    `MAKEFILE_LIST`), which covers nested and computed includes.
+    """
+    for line in db:
+        if line.startswith(_makefile_list_pattern):
+            return line[len(_makefile_list_pattern) :].split()
+    return []
+
+
 @click.command()
+@o_shell_cache
+@o_clean_env
+@o_timeout
 @click.argument("makefile")
 def db(*args, **kwargs):
     """
     Alias for 'database' subcommand.
     """
-    return print("\n".join(_database(*args, **kwargs)))
+    return database.callback(*args, **kwargs)
 
 
 @click.command()
@@ -688,6 +1415,8 @@ def _includes(makefile: str = ""):
 
 
 @click.command()
+@o_timeout
+@o_snapshot
 @click.argument("makefile")
 def stats(*args, **kwargs):
     """
@@ -704,11 +1433,22 @@ def _stats(*args, **kwargs) -> typing.Dict:
             if v.get(attr):
                 out[attr] += 1
     out.update(count=len(data))
-    includes = _includes(*args, **kwargs)
-    tmp = {k: len(v) for k, v in _vars(*args, **kwargs).items()}
-    return dict(
+    includes = _includes(makefile=kwargs["makefile"])
+    tmp = {}
+    # if make already timed out for targets, don't wait on it again for vars
+    partial = any(v.get("partial") for v in data.values())
+    if not partial:
+        try:
+            tmp = {k: len(v) for k, v in _vars(*args, **kwargs).items()}
+        except TimeoutError as exc:
+            LOGGER.warning(f"{exc}; variable counts are unavailable")
+            partial = True
+    out = dict(
         targets=out, vars=tmp, includes=dict(files=includes, count=len(includes))
     )
+    if partial:
+        out.update(partial=True)
+    return out
 
 
 ## Vars Entrypoint
@@ -717,34 +1457,61 @@ def _stats(*args, **kwargs) -> typing.Dict:
 
 @click.command()
 @o_local
+@o_shell_cache
+@o_clean_env
+@o_timeout
+@o_snapshot
 @click.argument("makefile")
 def vars(*args, **kwargs):
     """
     Details about variables and assignments.
     """
-    return json_output(_vars(*args, **kwargs))
+    try:
+        return json_output(_vars(*args, **kwargs))
+    except TimeoutError as exc:
+        LOGGER.critical(exc)
+        sys.exit(1)
 
 
+@cached_model
 def _vars(*args, **kwargs) -> typing.Dict:
     """
     Extract variables and assignment metadata.
     """
     makefile = kwargs["makefile"]
     local = kwargs.pop("local", False)
+    if kwargs.pop("snapshot", False):
+        out = _snapshot_load(makefile, "vars_local" if local else "vars")
+        if out is not None:
+            return out
     db = _database(*args, **kwargs)
+    return _vars_from_db(db, makefile, local=local)
+
+
+def _vars_from_db(
+    db: typing.List[str], makefile: str, local: bool = False
+) -> typing.Dict:
+    """
+    Like `_vars`, but for a db that has already been built.
+    """
     variables_start = db.index(_variables_pattern)
     variables_end = db.index(_variables_end_pattern)
     text = "\n".join(db[variables_start:variables_end])
     p1 = re.compile(r"[#] makefile [(]from .*, line \d+[)]")
     p2 = re.compile("[#] environment")
+    # other origins are only used as delimiters
+    p3 = re.compile(
+        r"^[#] (?:default|automatic|command line|'override' directive)$", re.M
+    )
     key1 = "makefile"
     key2 = "environment"
-    result = {key1: [], key2: []}
+    key3 = "other"
+    patterns = {key1: p1, key2: p2, key3: p3}
+    result = {key1: [], key2: [], key3: []}
     matches = []
-    for match in p1.finditer(text):
-        matches.append((match.end(), key1))
-    for match in p2.finditer(text):
-        matches.append((match.end(), key2))
+    for key, pattern in patterns.items():
+        for match in pattern.finditer(text):
+            matches.append((match.end(), key))
     matches.sort(key=lambda x: x[0])
     for i, (pos, pattern_key) in enumerate(matches):
         if not var_is_local(
@@ -757,7 +1524,7 @@ def _vars(*args, **kwargs) -> typing.Dict:
         if i + 1 < len(matches):
             next_match_start = matches[i + 1][0]
             next_pattern = matches[i + 1][1]
-            next_pattern_obj = p1 if next_pattern == key1 else p2
+            next_pattern_obj = patterns[next_pattern]
             for _m in next_pattern_obj.finditer(text[:next_match_start]):
                 pass  # Get last match before next_match_start
             block = (
@@ -827,16 +1594,20 @@ def var_is_local(
     default=False,
     help="Pattern to look for in keys",
 )
-def cblocks(
+def cblocks(*args, **kwargs):
+    """
+    Extract labeled comment-blocks.
+    """
+    return json_output(_cblocks(*args, **kwargs))
+
+
+def _cblocks(
     makefile: str = None,
     pattern: str = "",
     lucky: bool = False,
     start_check=lambda s: any([s.startswith(x) for x in ["## BEGIN:", "# BEGIN:"]]),
     end_check=lambda s: any([not s.strip(), not s.startswith("#")]),
 ):
-    """
-    Extract labeled comment-blocks.
-    """
     blocks = collections.defaultdict(list)
     with open(makefile) as fhandle:
         lines = fhandle.readlines()
@@ -873,7 +1644,607 @@ def cblocks(
         out = list(out.items())
         out = out[0] if out else None
         out = dict(label=out[0], block=out[1]) if out else None
-    return json_output(out)
+    return out
+
+
+## Snapshot Entrypoint
+##░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░
+
+SNAPSHOT_FORMAT = "mk.parse/snapshot"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = ".mk.parse.json"
+
+
+def _snapshot_path(makefile: str) -> str:
+    return f"{makefile}{SNAPSHOT_SUFFIX}"
+
+
+def _content_fingerprint(files: typing.List[str]) -> typing.List[typing.List]:
+    """
+    Size and sha256 for each file.  Unlike `_fingerprint`, this stays
+    valid across clones/checkouts, which is what committed snapshots need.
+    """
+    out = []
+    for fname in files:
+        try:
+            with open(fname, "rb") as fhandle:
+                content = fhandle.read()
+        except OSError:
+            out.append([fname, None, None])
+        else:
+            out.append([fname, len(content), hashlib.sha256(content).hexdigest()])
+    return out
+
+
+def _snapshot_valid(sources: typing.List[typing.List]) -> bool:
+    """
+    Cheap check first (sizes via stat), then content hashes.
+    """
+    for fname, size, _digest in sources:
+        try:
+            current = os.stat(fname).st_size
+        except OSError:
+            current = None
+        if current != size:
+            return False
+    return _content_fingerprint([s[0] for s in sources]) == sources
+
+
+def _snapshot_load(makefile: str, key: str):
+    """
+    Returns the given section of the makefile's snapshot, or `None`
+    if the snapshot is missing, from another version, or stale.
+    """
+    path = _snapshot_path(makefile)
+    try:
+        with open(path) as fhandle:
+            data = json.load(fhandle)
+    except (OSError, ValueError):
+        LOGGER.warning(f"no usable snapshot @ `{path}`, parsing {makefile}")
+        return None
+    if [data.get("format"), data.get("version")] != [SNAPSHOT_FORMAT, SNAPSHOT_VERSION]:
+        LOGGER.warning(f"snapshot @ `{path}` is from another version, ignoring it")
+        return None
+    if not _snapshot_valid(data["sources"]):
+        LOGGER.warning(f"snapshot @ `{path}` is stale, parsing {makefile}")
+        return None
+    LOGGER.debug(f"using snapshot @ {path}")
+    _SOURCES[makefile] = [s[0] for s in data["sources"]]
+    return data[key]
+
+
+@click.command("export-snapshot")
+@o_shell_cache
+@o_clean_env
+@click.argument("makefile")
+def export_snapshot(*args, **kwargs):
+    """
+    Write a help snapshot next to the Makefile.
+
+    Subcommands with '--snapshot' can load this instead of running
+    make and parsing its db, for as long as sources are unchanged.
+    """
+    return json_output(_export_snapshot(*args, **kwargs))
+
+
+def _export_snapshot(makefile: str = "", **kwargs) -> typing.Dict:
+    validate_makefile(makefile)
+    build = {}
+    targets = _target_model(makefile, build=build, **kwargs)
+    sources = build["sources"]
+    data = dict(
+        format=SNAPSHOT_FORMAT,
+        version=SNAPSHOT_VERSION,
+        makefile=makefile,
+        sources=_content_fingerprint(sources),
+        targets=targets,
+        vars=_vars(makefile=makefile, **kwargs),
+        vars_local=_vars(makefile=makefile, local=True, **kwargs),
+        includes=_includes(makefile),
+    )
+    path = _snapshot_path(makefile)
+    with open(path, "w") as fhandle:
+        json.dump(data, fhandle, separators=(",", ":"))
+    return dict(snapshot=path, targets=len(targets), sources=sources)
+
+
+## Watch Entrypoint
+##░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░
+
+# See `man 7 inotify`
+IN_MODIFY, IN_ATTRIB, IN_CLOSE_WRITE = 0x2, 0x4, 0x8
+IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x40, 0x80, 0x100, 0x200
+IN_WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+)
+
+
+def _inotify(dirs: typing.Iterable[str], fd: int = None) -> typing.Optional[int]:
+    """
+    Returns a non-blocking inotify fd watching the given directories
+    (added to `fd`, if given), or `None` where inotify isn't available
+    (callers should poll).
+
+    Directories are watched rather than files, because many editors
+    save by replacing the file.
+    """
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if fd is None:
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError, TypeError):
+        return None
+    if fd < 0:
+        return None
+    for dname in dirs:
+        if libc.inotify_add_watch(fd, os.fsencode(dname), IN_WATCH_MASK) < 0:
+            LOGGER.warning(f"inotify: cannot watch {dname}, polling instead")
+            os.close(fd)
+            return None
+    return fd
+
+
+def _drain(fd: int, timeout: float) -> bool:
+    """
+    Waits up to `timeout` for inotify events, discarding them.
+    Returns True if there were any.
+    """
+    if not select.select([fd], [], [], timeout)[0]:
+        return False
+    try:
+        while os.read(fd, 65536):
+            pass
+    except BlockingIOError:
+        pass
+    return True
+
+
+def _wait_for_change(
+    sources: typing.List[str],
+    before: typing.Tuple,
+    fd: int = None,
+    interval: float = 1.0,
+    debounce: float = 0.2,
+):
+    """
+    Blocks until the fingerprint for sources differs from `before`,
+    then until there have been no further changes for `debounce`
+    seconds.  Polls unless given an inotify `fd` watching the sources.
+
+    `before` should be the fingerprint from when the last build started,
+    so that changes made *during* the build are noticed right away.
+    """
+    current = _fingerprint(sources)
+    while current == before:
+        if fd is None:
+            time.sleep(interval)
+        else:
+            # NB: timeout is only a safety-net, events wake us early
+            _drain(fd, interval)
+        current = _fingerprint(sources)
+    while True:
+        if fd is not None:
+            if not _drain(fd, debounce):
+                break
+        else:
+            time.sleep(debounce)
+            latest = _fingerprint(sources)
+            if latest == current:
+                break
+            current = latest
+
+
+def _write_if_changed(path: str, content: str) -> bool:
+    try:
+        with open(path) as fhandle:
+            if fhandle.read() == content:
+                return False
+    except OSError:
+        pass
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as fhandle:
+        fhandle.write(content)
+    os.replace(tmp, path)
+    return True
+
+
+@click.command()
+@o_shell_cache
+@o_clean_env
+@o_timeout
+@click.option("--json", "json_file", default="", help="Keep this JSON file updated")
+@click.option(
+    "--markdown", "markdown_file", default="", help="Keep this markdown file updated"
+)
+@click.option(
+    "--interval",
+    type=float,
+    default=1.0,
+    help="Seconds between checks when polling (default: 1.0)",
+)
+@click.option(
+    "--debounce",
+    type=float,
+    default=0.2,
+    help="Seconds without changes before rebuilding (default: 0.2)",
+)
+@click.option(
+    "--poll",
+    is_flag=True,
+    default=False,
+    help="Always poll, even if inotify is available",
+)
+@click.argument("makefile")
+def watch(*args, **kwargs):
+    """
+    Keep generated JSON/markdown for the Makefile up to date.
+
+    Watches the Makefile and everything it includes, rewriting only
+    outputs whose content changed.  Prints one JSON line per cycle.
+    """
+    try:
+        _watch(*args, **kwargs)
+    except KeyboardInterrupt:
+        pass
+
+
+def _watch(
+    makefile: str = "",
+    json_file: str = "",
+    markdown_file: str = "",
+    interval: float = 1.0,
+    debounce: float = 0.2,
+    poll: bool = False,
+    **kwargs,
+):
+    if not any([json_file, markdown_file]):
+        raise click.UsageError("nothing to do, use --json and/or --markdown")
+    # NB: the fd stays open across rebuilds, so edits made while make is
+    # running are still queued when we start waiting again.
+    watched = {os.path.dirname(os.path.abspath(makefile))}
+    fd = None if poll else _inotify(watched)
+    build = {}
+    cycle = 0
+    try:
+        while True:
+            start = time.monotonic()
+            report = dict(cycle=cycle, written=[])
+            # if the cycle fails, wait for something to change from here
+            failed = _fingerprint(build.get("sources") or [makefile])
+            try:
+                outputs = {}
+                # NB: both outputs share one make run, via `_target_model`'s cache
+                if json_file:
+                    out = _targets(
+                        makefile=makefile, abs_paths=False, build=build, **kwargs
+                    )
+                    outputs[json_file] = json.dumps(out, indent=2) + "\n"
+                if markdown_file:
+                    out = _targets(
+                        makefile=makefile,
+                        abs_paths=False,
+                        markdown=True,
+                        build=build,
+                        **kwargs,
+                    )
+                    outputs[markdown_file] = _render_markdown(out) + "\n"
+                for path, content in outputs.items():
+                    if _write_if_changed(path, content):
+                        report["written"].append(path)
+            except Exception as exc:
+                # transient states (branch switch, editor replacing the file,
+                # half-saved include) shouldn't end a long-running watcher
+                LOGGER.warning(f"watch: cycle {cycle} failed: {exc}")
+                report.update(error=str(exc))
+            else:
+                failed = None
+            sources = build.get("sources") or [makefile]
+            report.update(
+                sources=len(sources),
+                latency_ms=round(1000 * (time.monotonic() - start), 1),
+            )
+            print(json.dumps(report), flush=True)
+            cycle += 1
+            dirs = {os.path.dirname(os.path.abspath(f)) for f in sources} - watched
+            if fd is not None and dirs:
+                fd = _inotify(sorted(dirs), fd)
+                watched |= dirs
+            # compare against the fingerprint from *before* this build
+            before = failed or build.get("fingerprint") or _fingerprint(sources)
+            _wait_for_change(
+                sources, before, fd=fd, interval=interval, debounce=debounce
+            )
+    finally:
+        if fd is not None:
+            os.close(fd)
+
+
+## Index & Search Entrypoints
+##░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS makefiles (
+    path TEXT PRIMARY KEY, sources TEXT, fingerprint TEXT, indexed REAL);
+CREATE TABLE IF NOT EXISTS targets (
+    makefile TEXT, name TEXT, file TEXT, lineno INTEGER, type TEXT,
+    local INTEGER, private INTEGER, parametric INTEGER, docs TEXT);
+CREATE TABLE IF NOT EXISTS prereqs (makefile TEXT, target TEXT, prereq TEXT);
+CREATE TABLE IF NOT EXISTS variables (
+    makefile TEXT, name TEXT, flavor TEXT, value TEXT);
+CREATE TABLE IF NOT EXISTS cblocks (makefile TEXT, label TEXT, block TEXT);
+CREATE INDEX IF NOT EXISTS targets_name ON targets(name);
+CREATE INDEX IF NOT EXISTS prereqs_prereq ON prereqs(prereq);
+CREATE INDEX IF NOT EXISTS variables_name ON variables(name);
+"""
+INDEX_TABLES = "targets prereqs variables cblocks docs".split()
+MAKEFILE_NAMES = "GNUmakefile makefile Makefile".split()
+o_index = click.option(
+    "--index",
+    "index_file",
+    default=os.environ.get("MKPARSE_INDEX", ".mk.parse.sqlite"),
+    help="Path to the SQLite index (default: $MKPARSE_INDEX or .mk.parse.sqlite)",
+)
+
+
+def _index_connect(index_file: str) -> sqlite3.Connection:
+    """
+    Opens (and if necessary creates) the index.  Full-text search
+    uses FTS5 when sqlite was built with it, otherwise a plain table
+    that `_search` falls back to scanning with LIKE.
+    """
+    conn = sqlite3.connect(index_file)
+    conn.executescript(INDEX_SCHEMA)
+    try:
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5("
+            "makefile UNINDEXED, kind UNINDEXED, file UNINDEXED, "
+            "lineno UNINDEXED, name, text)"
+        )
+    except sqlite3.OperationalError:
+        LOGGER.warning("sqlite has no fts5 support, search will be slower")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            "makefile TEXT, kind TEXT, file TEXT, lineno INTEGER, name TEXT, text TEXT)"
+        )
+    return conn
+
+
+def _find_makefiles(paths: typing.Iterable[str]) -> typing.List[str]:
+    """
+    Expands directories into the makefiles underneath them, as
+    absolute paths.
+    """
+    out = []
+    for path in paths:
+        path = os.path.abspath(path)
+        if not os.path.isdir(path):
+            out.append(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            out += [
+                os.path.join(root, f)
+                for f in sorted(files)
+                if f in MAKEFILE_NAMES or f.endswith(".mk")
+            ]
+    return out
+
+
+@click.command()
+@o_index
+@click.option(
+    "-f",
+    "--force",
+    is_flag=True,
+    default=False,
+    help="Re-index everything, even if fingerprints are unchanged",
+)
+@click.argument("paths", nargs=-1, required=True)
+def index(*args, **kwargs):
+    """
+    Index targets, prereqs, vars, cblocks and docs into SQLite.
+
+    Paths may be makefiles or directories (searched for makefiles).
+    Indexing is incremental, keyed on each makefile's fingerprint.
+    """
+    return json_output(_index(*args, **kwargs))
+
+
+def _index(
+    paths: typing.Iterable[str] = (),
+    index_file: str = ".mk.parse.sqlite",
+    force: bool = False,
+) -> typing.Dict:
+    conn = _index_connect(index_file)
+    known = {
+        path: (json.loads(sources), fprint)
+        for path, sources, fprint in conn.execute(
+            "SELECT path, sources, fingerprint FROM makefiles"
+        )
+    }
+    includes = {path: set(sources) - {path} for path, (sources, _) in known.items()}
+    report = dict(indexed=[], unchanged=[], included=[], failed=[], removed=[])
+    # real makefiles go first, so we know which `*.mk` are just fragments of them
+    makefiles = sorted(_find_makefiles(paths), key=lambda f: f.endswith(".mk"))
+    for makefile in makefiles:
+        if makefile.endswith(".mk") and any(
+            makefile in v for k, v in includes.items() if k != makefile
+        ):
+            # indexed as part of whatever includes it, evaluating it standalone
+            # would duplicate its targets (and re-run its `$(shell ..)` calls)
+            if makefile in known:
+                with conn:
+                    _index_forget(conn, makefile)
+                    conn.execute("DELETE FROM makefiles WHERE path=?", (makefile,))
+                includes.pop(makefile, None)
+            report["included"].append(makefile)
+            continue
+        sources, fprint = known.get(makefile, ([makefile], None))
+        if not force and fprint == json.dumps(_fingerprint(sources)):
+            report["unchanged"].append(makefile)
+            continue
+        try:
+            with conn:
+                sources = _index_makefile(conn, makefile)
+        except Exception as exc:
+            LOGGER.warning(f"failed indexing {makefile}: {exc}")
+            report["failed"].append(makefile)
+        else:
+            includes[makefile] = set(sources) - {makefile}
+            report["indexed"].append(makefile)
+    for makefile in known:
+        if not os.path.exists(makefile):
+            with conn:
+                _index_forget(conn, makefile)
+                conn.execute("DELETE FROM makefiles WHERE path=?", (makefile,))
+            report["removed"].append(makefile)
+    conn.close()
+    return {k: v for k, v in report.items() if v}
+
+
+def _index_forget(conn: sqlite3.Connection, makefile: str):
+    for table in INDEX_TABLES:
+        conn.execute(f"DELETE FROM {table} WHERE makefile=?", (makefile,))
+
+
+def _index_makefile(conn: sqlite3.Connection, makefile: str) -> typing.List[str]:
+    """
+    Replaces everything indexed for the given makefile, returning
+    its sources.
+
+    Make runs (once) in the makefile's own directory, so that relative
+    includes resolve the same way they would for `make -C`.
+    """
+    LOGGER.info(f"indexing {makefile}")
+    cwd = os.path.dirname(makefile)
+    build = {}
+    db = _database(makefile, cwd=cwd, build=build)
+    sources, fprint = build["sources"], build["fingerprint"]
+    tdata = _target_model_from_db(db, makefile)
+    vdata = _vars_from_db(db, makefile)
+    bdata = _cblocks(makefile=makefile)
+    _index_forget(conn, makefile)
+    for name, meta in tdata.items():
+        docs = "\n".join(x.strip() for x in meta["docs"])
+        meta["file"] = meta["file"] and os.path.join(cwd, meta["file"])
+        conn.execute(
+            "INSERT INTO targets VALUES (?,?,?,?,?,?,?,?,?)",
+            (
+                makefile,
+                name,
+                meta["file"],
+                meta["lineno"],
+                meta["type"],
+                meta["local"],
+                meta["private"],
+                meta["parametric"],
+                docs,
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO prereqs VALUES (?,?,?)",
+            [(makefile, name, p) for p in meta["prereqs"]],
+        )
+        conn.execute(
+            "INSERT INTO docs VALUES (?,?,?,?,?,?)",
+            (makefile, "target", meta["file"], meta["lineno"], name, docs),
+        )
+    for flavor, assignments in vdata.items():
+        for name, value in assignments.items():
+            conn.execute(
+                "INSERT INTO variables VALUES (?,?,?,?)",
+                (makefile, name, flavor, value),
+            )
+            conn.execute(
+                "INSERT INTO docs VALUES (?,?,?,?,?,?)",
+                (makefile, "variable", makefile, None, name, value),
+            )
+    for label, block in bdata.items():
+        block = "\n".join(block)
+        conn.execute("INSERT INTO cblocks VALUES (?,?,?)", (makefile, label, block))
+        conn.execute(
+            "INSERT INTO docs VALUES (?,?,?,?,?,?)",
+            (makefile, "cblock", makefile, None, label, block),
+        )
+    conn.execute(
+        "INSERT OR REPLACE INTO makefiles VALUES (?,?,?,?)",
+        (makefile, json.dumps(sources), json.dumps(fprint), time.time()),
+    )
+    return sources
+
+
+@click.command()
+@o_index
+@click.option(
+    "-k",
+    "--kind",
+    type=click.Choice(["target", "variable", "cblock"]),
+    default=None,
+    help="Restrict results to one kind of object",
+)
+@click.option(
+    "--raw",
+    is_flag=True,
+    default=False,
+    help="Pass query through as FTS5 syntax (default is prefix-match on each word)",
+)
+@click.option("--limit", default=20, help="Maximum number of results")
+@click.argument("query")
+def search(*args, **kwargs):
+    """
+    Full-text search over an index built by 'index'.  Never runs make.
+    """
+    if not kwargs["query"].strip():
+        raise click.UsageError("search query is empty")
+    try:
+        return json_output(_search(*args, **kwargs))
+    except sqlite3.OperationalError as exc:
+        LOGGER.critical(f"bad search query {kwargs['query']!r}: {exc}")
+        sys.exit(1)
+
+
+def _search(
+    query: str = "",
+    index_file: str = ".mk.parse.sqlite",
+    kind: str = None,
+    raw: bool = False,
+    limit: int = 20,
+) -> typing.List[typing.Dict]:
+    if not os.path.exists(index_file):
+        err = f"No index @ `{index_file}`, use the 'index' subcommand first"
+        LOGGER.critical(err)
+        raise ValueError(err)
+    conn = sqlite3.connect(index_file)
+    sql = "SELECT sql FROM sqlite_master WHERE name='docs'"
+    (schema,) = conn.execute(sql).fetchone()
+    fts = "fts5" in schema.lower()
+    cols = "kind, name, makefile, file, lineno"
+    if fts:
+        if not raw:
+            query = " ".join(
+                '"{}"*'.format(w.replace('"', '""')) for w in query.split()
+            )
+        sql = f"SELECT {cols}, snippet(docs, 5, '', '', '..', 12) FROM docs WHERE docs MATCH ?"
+        params = [query]
+    else:
+        sql = f"SELECT {cols}, substr(text, 1, 80) FROM docs WHERE (name LIKE ? OR text LIKE ?)"
+        params = [f"%{query}%"] * 2
+    if kind:
+        sql += " AND kind = ?"
+        params.append(kind)
+    sql += " ORDER BY rank" if fts else ""
+    sql += " LIMIT ?"
+    params.append(limit)
+    keys = "kind name makefile file lineno snippet".split()
+    out = [dict(zip(keys, row)) for row in conn.execute(sql, params)]
+    conn.close()
+    return out
 
 
 ## Final Assembly & Main Entrypoint
@@ -887,7 +2258,22 @@ def main():
     """
 
 
-[main.add_command(x) for x in [vars, stats, cblocks, database, db, targets, includes]]
+[
+    main.add_command(x)
+    for x in [
+        vars,
+        stats,
+        cblocks,
+        database,
+        db,
+        targets,
+        includes,
+        index,
+        search,
+        export_snapshot,
+        watch,
+    ]
+]
 
 if __name__ == "__main__":
     main()
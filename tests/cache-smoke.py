@@ -0,0 +1,36 @@
+#!/usr/bin/env -S uv run --script
+# /// script
+# dependencies = [
+#   "click==8.1.8","Jinja2==3.1.6","rich==14.1.0",
+# ]
+# ///
+"""
+Smoke-test for the in-process model cache: hits while sources are
+unchanged, misses once an included file changes.
+
+USAGE: ./tests/cache-smoke.py <makefile> <included-file>
+"""
+
+import json
+import os
+import runpy
+import sys
+import time
+
+mkp = runpy.run_path("src/mk.parse.py", run_name="mk_parse")
+cache, targets = mkp["MODEL_CACHE"], mkp["_targets"]
+makefile, include = sys.argv[1:]
+
+# NB: backdate sources, so fresh checkouts aren't "modified during the build"
+past = time.time() - 60
+for fname in [makefile, include]:
+    os.utime(fname, (past, past))
+first = targets(makefile=makefile)
+assert targets(makefile=makefile) == first, "cached model differs"
+assert [cache.hits, cache.misses] == [1, 1], cache.stats()
+os.utime(include, (past + 30, past + 30))
+assert targets(makefile=makefile) == first, "rebuilt model differs"
+assert [cache.hits, cache.misses] == [1, 2], cache.stats()
+targets(makefile=makefile)
+assert [cache.hits, cache.misses] == [2, 2], cache.stats()
+print(json.dumps({k: v for k, v in cache.stats().items() if k != "bytes"}))
@@ -0,0 +1,5 @@
+INCLUDED := 1
+
+included.target:
+	@# Target from an included file
+	echo included
@@ -0,0 +1,10 @@
+# Fixture: an include (relative to this file) and a $(shell ..) call
+GREETING := $(shell echo hello)
+include $(dir $(lastword $(MAKEFILE_LIST)))sample-2.inc.mk
+
+build: included.target
+	@# Project build, via an included target
+
+greet:
+	@# Prints a greeting
+	echo ${GREETING}
@@ -0,0 +1,5 @@
+# Fixture: a makefile whose evaluation is slow, for exercising --timeout
+SLOW := $(shell sleep 3)
+
+build:
+	@# Project build